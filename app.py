@@ -5,27 +5,160 @@ import socket
 import json
 import urllib.request
 
-from PySide6.QtCore import QObject, Signal, Qt, QTimer
-from PySide6.QtGui import QFont, QGuiApplication, QTextCursor, QFontDatabase
+from PySide6.QtCore import QObject, Signal, Qt, QTimer, QRunnable, QThreadPool, QThread
+from PySide6.QtGui import QFont, QGuiApplication, QFontDatabase
 from PySide6.QtWidgets import (
     QApplication, QMainWindow, QWidget,
     QVBoxLayout, QHBoxLayout,
     QPushButton, QLabel, QStackedWidget,
-    QListWidget, QListWidgetItem, QTextEdit, QMessageBox,
+    QListWidget, QTextEdit, QMessageBox,
     QLineEdit, QToolButton, QMenu, QFileDialog
 )
 
 from core.server import NotNetServer
 from core.client import NotNetClient
-from core.protocol import PROTOCOL_VERSION
+from core.protocol import PROTOCOL_VERSION, MAX_USERNAME
 
 APP_VERSION = "1.1.0"
 GITHUB_LATEST_URL = "https://api.github.com/repos/oguzokdotdev/notnet-messenger/releases/latest"
+LOG_MAX_LINES = 2000
+
+APP_QSS = """
+QWidget {
+    background-color: #0f1115;
+    color: #e6edf3;
+    font-family: "JetBrains Mono";
+    font-size: 11pt;
+}
+QPushButton {
+    background-color: #161b22;
+    border: 1px solid #30363d;
+    border-radius: 8px;
+    padding: 12px;
+}
+QPushButton:hover { background-color: #1f242d; }
+QPushButton:pressed { background-color: #0d1117; }
+
+#startPage QLabel#sectionTitle { font-size: 12pt; font-weight: 650; margin-bottom: 6px; }
+#startPage QWidget#startCard {
+    border-radius: 14px;
+    border: 1px solid rgba(148,163,184,0.18);
+    background: rgba(2,6,23,0.15);
+}
+#startPage QPushButton {
+    padding: 10px 12px;
+    border-radius: 10px;
+    background: rgba(148,163,184,0.14);
+    border: 1px solid rgba(148,163,184,0.20);
+}
+#startPage QPushButton:hover { background: rgba(148,163,184,0.22); }
+
+#serverPage QWidget { font-size: 11pt; }
+#serverPage QLabel#title { font-size: 16pt; font-weight: 700; margin-bottom: 4px; }
+#serverPage QLabel#sectionTitle { font-size: 12pt; font-weight: 650; margin-top: 6px; }
+#serverPage QLabel#addr { font-family: monospace; font-size: 11pt; padding: 8px 10px; border-radius: 10px; background: rgba(148,163,184,0.12); }
+#serverPage QLabel#uptime { color: rgba(226,232,240,0.85); }
+#serverPage QPushButton { padding: 8px 12px; border-radius: 10px; background: rgba(148,163,184,0.14); border: 1px solid rgba(148,163,184,0.20); }
+#serverPage QPushButton:hover { background: rgba(148,163,184,0.22); }
+#serverPage QPushButton:disabled { opacity: 0.45; }
+#serverPage QListWidget#clientsList { border-radius: 12px; padding: 8px; border: 1px solid rgba(148,163,184,0.18); background: rgba(2,6,23,0.15); }
+#serverPage QListWidget#clientsList::item { padding: 6px 8px; border-radius: 8px; }
+#serverPage QListWidget#clientsList::item:selected { background: rgba(96,165,250,0.25); }
+#serverPage QTextEdit#log { border-radius: 12px; padding: 10px; border: 1px solid rgba(148,163,184,0.18); background: rgba(2,6,23,0.15); }
+#serverPage QLineEdit { padding: 8px 10px; border-radius: 10px; border: 1px solid rgba(148,163,184,0.20); background: rgba(2,6,23,0.25); }
+#serverPage QLineEdit:focus { border: 1px solid #60a5fa; }
+#serverPage QToolButton { padding: 4px 8px; border-radius: 8px; background: rgba(148,163,184,0.14); border: 1px solid rgba(148,163,184,0.20); }
+#serverPage QToolButton:hover { background: rgba(148,163,184,0.22); }
+
+#clientPage QWidget { font-size: 11pt; }
+#clientPage QLabel#title { font-size: 16pt; font-weight: 700; margin-bottom: 4px; }
+#clientPage QLabel#sectionTitle { font-size: 12pt; font-weight: 650; margin-top: 6px; }
+#clientPage QLabel#addr {
+    font-family: monospace;
+    font-size: 11pt;
+    padding: 8px 10px;
+    border-radius: 10px;
+    background: rgba(148,163,184,0.12);
+}
+#clientPage QLabel#muted { color: rgba(226,232,240,0.78); }
+#clientPage QWidget#connectCard {
+    border-radius: 14px;
+    border: 1px solid rgba(148,163,184,0.18);
+    background: rgba(2,6,23,0.15);
+}
+#clientPage QPushButton {
+    padding: 8px 12px;
+    border-radius: 10px;
+    background: rgba(148,163,184,0.14);
+    border: 1px solid rgba(148,163,184,0.20);
+}
+#clientPage QPushButton:hover { background: rgba(148,163,184,0.22); }
+#clientPage QPushButton:disabled { opacity: 0.45; }
+#clientPage QListWidget#clientsList {
+    border-radius: 12px;
+    padding: 8px;
+    border: 1px solid rgba(148,163,184,0.18);
+    background: rgba(2,6,23,0.15);
+}
+#clientPage QListWidget#clientsList::item {
+    padding: 6px 8px;
+    border-radius: 8px;
+}
+#clientPage QListWidget#clientsList::item:selected {
+    background: rgba(96,165,250,0.25);
+}
+#clientPage QTextEdit#log {
+    border-radius: 12px;
+    padding: 10px;
+    border: 1px solid rgba(148,163,184,0.18);
+    background: rgba(2,6,23,0.15);
+}
+#clientPage QLineEdit {
+    padding: 8px 10px;
+    border-radius: 10px;
+    border: 1px solid rgba(148,163,184,0.20);
+    background: rgba(2,6,23,0.25);
+}
+#clientPage QLineEdit:focus { border: 1px solid #60a5fa; }
+"""
 
 def _resource_path(rel_path: str) -> str:
     base = getattr(sys, "_MEIPASS", os.path.abspath("."))
     return os.path.join(base, rel_path)
 
+_HTML_TRANS = str.maketrans({
+    "&": "&amp;",
+    "<": "&lt;",
+    ">": "&gt;",
+    '"': "&quot;",
+    "'": "&#39;",
+})
+
+def _esc(s: str) -> str:
+    return s.translate(_HTML_TRANS)
+
+_ts_cache = [0, ""]
+
+def _fmt_ts() -> str:
+    now = int(time.time())
+    if now != _ts_cache[0]:
+        _ts_cache[0] = now
+        _ts_cache[1] = time.strftime("%H:%M:%S", time.localtime(now))
+    return _ts_cache[1]
+
+def _html_paragraphs(lines) -> str:
+    # по абзацу на строку: лимит блоков документа = лимит строк лога
+    return "".join(f'<p style="margin:0;">{line}</p>' for line in lines)
+
+def _append_html(view: QTextEdit, html: str):
+    # докручиваем вниз, только если пользователь и так был внизу —
+    # не сбиваем чтение истории
+    sb = view.verticalScrollBar()
+    at_bottom = sb.value() >= sb.maximum() - sb.singleStep()
+    view.append(html)
+    if at_bottom:
+        sb.setValue(sb.maximum())
+
 def load_app_fonts():
     font_path = _resource_path("assets/fonts/JetBrainsMono-Regular.ttf")
     if os.path.exists(font_path):
@@ -40,6 +173,7 @@ class BigButton(QPushButton):
 class StartPage(QWidget):
     def __init__(self, go_server, go_client, go_settings):
         super().__init__()
+        self.setObjectName("startPage")
 
         outer = QVBoxLayout(self)
         outer.setSpacing(0)
@@ -84,45 +218,85 @@ class StartPage(QWidget):
         outer.addLayout(row)
         outer.addStretch(1)
 
-        self.setStyleSheet(self._css())
-
-    def _css(self) -> str:
-        return """
-        QLabel#sectionTitle { font-size: 12pt; font-weight: 650; margin-bottom: 6px; }
-        QWidget#startCard {
-            border-radius: 14px;
-            border: 1px solid rgba(148,163,184,0.18);
-            background: rgba(2,6,23,0.15);
-        }
-        QPushButton {
-            padding: 10px 12px;
-            border-radius: 10px;
-            background: rgba(148,163,184,0.14);
-            border: 1px solid rgba(148,163,184,0.20);
-        }
-        QPushButton:hover { background: rgba(148,163,184,0.22); }
-        """
-
-
-class ServerBridge(QObject):
+
+class ServerWorker(QObject):
     log = Signal(str, str)
     clients = Signal(list)
+    finished = Signal()
+
+    def __init__(self, server: NotNetServer):
+        super().__init__()
+        self.server = server
+
+    def run(self):
+        try:
+            self.server.start()
+        finally:
+            self.finished.emit()
+
+
+class LocalIpProbe(QRunnable):
+    def __init__(self, done):
+        super().__init__()
+        self.done = done
+
+    def run(self):
+        s = None
+        ip = "127.0.0.1"
+        try:
+            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            s.connect(("8.8.8.8", 80))
+            ip = s.getsockname()[0]
+        except OSError:
+            pass
+        finally:
+            if s:
+                try:
+                    s.close()
+                except OSError:
+                    pass
+        self.done.emit(ip)
 
 
 class ServerPage(QWidget):
+    local_ip_ready = Signal(str)
+
+    _KIND_COLORS = {
+        "connect": "#22c55e",
+        "disconnect": "#ef4444",
+        "chat": "#cbd5e1",
+        "warn": "#f59e0b",
+        "error": "#f87171",
+        "info": "#94a3b8",
+    }
+
     def __init__(self, go_back):
         super().__init__()
+        self.setObjectName("serverPage")
 
         self.server = NotNetServer()
-        self.server_thread = None
         self._started_at_ts = None
+        self._cached_local_ip = None
+        self._addr_cache = None
+        self._addr_key = None
+        self._last_uptime_sec = -1
+        self._pending_clients = None
 
-        self.bridge = ServerBridge()
-        self.server.on_log = lambda text, kind="info": self.bridge.log.emit(text, kind)
-        self.server.on_clients = lambda items: self.bridge.clients.emit(items)
+        self._log_buf = []
+        self._log_flush_pending = False
 
-        self.bridge.log.connect(self._append_log)
-        self.bridge.clients.connect(self._set_clients)
+        self.server_thread = QThread(self)
+        self.worker = ServerWorker(self.server)
+        self.worker.moveToThread(self.server_thread)
+        self.server_thread.started.connect(self.worker.run)
+        self.worker.finished.connect(self.server_thread.quit)
+
+        self.server.on_log = self.worker.log.emit
+        self.server.on_clients = self.worker.clients.emit
+
+        self.worker.log.connect(self._append_log, Qt.QueuedConnection)
+        self.worker.clients.connect(self._set_clients, Qt.QueuedConnection)
+        self.local_ip_ready.connect(self._set_local_ip)
 
         layout = QVBoxLayout(self)
         layout.setSpacing(12)
@@ -142,7 +316,7 @@ class ServerPage(QWidget):
         ip_row = QHBoxLayout()
         ip_row.setSpacing(10)
 
-        self.lbl_addr = QLabel(self._format_addr())
+        self.lbl_addr = QLabel("…")
         self.lbl_addr.setObjectName("addr")
         self.lbl_addr.setTextInteractionFlags(Qt.TextSelectableByMouse)
 
@@ -224,6 +398,7 @@ class ServerPage(QWidget):
         self.log.setObjectName("log")
         self.log.setReadOnly(True)
         self.log.setAcceptRichText(True)
+        self.log.document().setMaximumBlockCount(LOG_MAX_LINES)
         right.addWidget(self.log, 1)
 
         broadcast_row = QHBoxLayout()
@@ -250,42 +425,40 @@ class ServerPage(QWidget):
         self.list_clients.itemSelectionChanged.connect(self._on_client_select)
 
         self.uptime_timer = QTimer(self)
-        self.uptime_timer.setInterval(1000)
+        self.uptime_timer.setInterval(500)
+        self.uptime_timer.setTimerType(Qt.CoarseTimer)
         self.uptime_timer.timeout.connect(self._tick_uptime)
 
-        self.setStyleSheet(self._css())
+        self._refresh_local_ip()
 
     def _format_addr(self) -> str:
-        ip = self._get_local_ip()
-        return f"{ip}:{self.server.port}"
-
-    def _get_local_ip(self) -> str:
-        s = None
-        try:
-            s = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
-            s.connect(("8.8.8.8", 80))
-            return s.getsockname()[0]
-        except OSError:
-            return "127.0.0.1"
-        finally:
-            if s:
-                try:
-                    s.close()
-                except OSError:
-                    pass
+        ip = self._cached_local_ip or "…"
+        key = (self.server.port, ip)
+        if key != self._addr_key:
+            self._addr_key = key
+            self._addr_cache = f"{ip}:{self.server.port}"
+        return self._addr_cache
+
+    def _refresh_local_ip(self):
+        self._cached_local_ip = None
+        QThreadPool.globalInstance().start(LocalIpProbe(self.local_ip_ready))
+
+    def _set_local_ip(self, ip: str):
+        self._cached_local_ip = ip
+        self.lbl_addr.setText(self._format_addr())
 
     def _copy_addr(self):
         QGuiApplication.clipboard().setText(self.lbl_addr.text())
         self._append_log("Copied address to clipboard", "info")
 
     def _start_server(self):
-        if self.server_thread and self.server_thread.is_alive():
+        if self.server_thread.isRunning():
             return
 
-        self.lbl_addr.setText(self._format_addr())
+        # адрес мог смениться между запусками — пересчитываем в фоне
+        self._refresh_local_ip()
         self._started_at_ts = None
 
-        self.server_thread = threading.Thread(target=self.server.start, daemon=True)
         self.server_thread.start()
 
         self.btn_start.setEnabled(False)
@@ -294,35 +467,57 @@ class ServerPage(QWidget):
     def _stop_server(self):
         self.server.stop()
 
-        t = self.server_thread
-        if t and t.is_alive():
-            threading.Thread(target=t.join, kwargs={"timeout": 2.0}, daemon=True).start()
+        self.server_thread.quit()
+        self.server_thread.wait(2000)
 
         self.btn_start.setEnabled(True)
         self.btn_stop.setEnabled(False)
         self.uptime_timer.stop()
-        self.lbl_uptime.setText("Uptime: 00:00:00")
+        self._reset_uptime()
         self._started_at_ts = None
 
+    def _reset_uptime(self):
+        self._last_uptime_sec = -1
+        self.lbl_uptime.setText("Uptime: 00:00:00")
+
     def _tick_uptime(self):
         if not self._started_at_ts:
-            self.lbl_uptime.setText("Uptime: 00:00:00")
+            if self._last_uptime_sec != -1:
+                self._reset_uptime()
             return
         sec = int(time.time() - self._started_at_ts)
+        if sec == self._last_uptime_sec:
+            return
+        self._last_uptime_sec = sec
         h = sec // 3600
         m = (sec % 3600) // 60
         s = sec % 60
         self.lbl_uptime.setText(f"Uptime: {h:02d}:{m:02d}:{s:02d}")
 
     def _set_clients(self, items):
+        scheduled = self._pending_clients is not None
+        self._pending_clients = items
+        if not scheduled:
+            QTimer.singleShot(50, self._flush_clients)
+
+    def _flush_clients(self):
+        items = self._pending_clients
+        self._pending_clients = None
+        if items is None:
+            return
+
         selected = self.list_clients.currentItem().text() if self.list_clients.currentItem() else None
+        labels = [f"{username}  ·  {addr}" for username, addr in items]
+
+        self.list_clients.setUpdatesEnabled(False)
         self.list_clients.clear()
-        for username, addr in items:
-            it = QListWidgetItem(f"{username}  ·  {addr}")
+        self.list_clients.addItems(labels)
+        for row, (username, _) in enumerate(items):
+            it = self.list_clients.item(row)
             it.setData(Qt.UserRole, username)
-            self.list_clients.addItem(it)
-            if selected and it.text() == selected:
+            if selected and labels[row] == selected:
                 it.setSelected(True)
+        self.list_clients.setUpdatesEnabled(True)
 
         self.btn_kick.setEnabled(self.list_clients.currentItem() is not None)
 
@@ -339,7 +534,7 @@ class ServerPage(QWidget):
             QMessageBox.information(self, "Kick", "Client not found (maybe already disconnected).")
 
     def _append_log(self, text: str, kind: str = "info"):
-        ts = time.strftime("%H:%M:%S", time.localtime())
+        ts = _fmt_ts()
         kind = kind or "info"
 
         if "NotNet Server running on" in text:
@@ -354,37 +549,32 @@ class ServerPage(QWidget):
             self.btn_start.setEnabled(True)
             self.btn_stop.setEnabled(False)
             self.uptime_timer.stop()
-            self.lbl_uptime.setText("Uptime: 00:00:00")
+            self._reset_uptime()
             self._started_at_ts = None
 
-        if kind == "connect":
-            color = "#22c55e"
-            msg = self._esc(text)
-        elif kind == "disconnect":
-            color = "#ef4444"
-            msg = self._esc(text)
-        elif kind == "chat":
-            color = "#cbd5e1"
+        color = self._KIND_COLORS.get(kind, "#94a3b8")
+        if kind == "chat":
             msg = self._format_chat(text)
-        elif kind == "warn":
-            color = "#f59e0b"
-            msg = self._esc(text)
-        elif kind == "error":
-            color = "#f87171"
-            msg = self._esc(text)
         else:
-            color = "#94a3b8"
-            msg = self._esc(text)
+            msg = _esc(text)
 
         line = (
             f'<span style="color:#64748b;">[{ts}]</span> '
             f'<span style="color:{color};">{msg}</span>'
         )
 
-        self.log.moveCursor(QTextCursor.End)
-        self.log.insertHtml(line)
-        self.log.insertPlainText("\n")
-        self.log.moveCursor(QTextCursor.End)
+        self._log_buf.append(line)
+        if not self._log_flush_pending:
+            self._log_flush_pending = True
+            QTimer.singleShot(16, self._flush_log)
+
+    def _flush_log(self):
+        self._log_flush_pending = False
+        if not self._log_buf:
+            return
+        html = _html_paragraphs(self._log_buf)
+        self._log_buf.clear()
+        _append_html(self.log, html)
 
     def _send_broadcast(self):
         text = self.input_broadcast.text().strip()
@@ -392,12 +582,13 @@ class ServerPage(QWidget):
             return
 
         message = f"SERVER: {text}"
-        self.server._broadcast(message)
+        self.server.broadcast(message)
 
         self._append_log(message, "chat")
         self.input_broadcast.clear()
 
     def _clear_log(self):
+        self._log_buf.clear()
         self.log.clear()
 
     def _export_log(self):
@@ -411,77 +602,57 @@ class ServerPage(QWidget):
         if not path:
             return
 
+        self._flush_log()
+
         try:
             with open(path, "w", encoding="utf-8") as f:
-                f.write(self.log.toPlainText())
+                block = self.log.document().begin()
+                while block.isValid():
+                    f.write(block.text())
+                    f.write("\n")
+                    block = block.next()
             self._append_log("Log exported successfully", "info")
         except Exception as e:
             self._append_log(f"Export failed: {e}", "error")
 
     def _format_chat(self, text: str) -> str:
-        if ":" not in text:
-            return self._esc(text)
-        user, msg = text.split(":", 1)
-        user = self._esc(user.strip())
-        msg = self._esc(msg.lstrip())
+        user, sep, msg = text.partition(":")
+        if not sep:
+            return _esc(text)
+        user = _esc(user.strip())
+        msg = _esc(msg.lstrip())
         return f'<span style="color:#60a5fa; font-weight:600;">{user}</span><span style="color:#64748b;">:</span> {msg}'
 
-    def _esc(self, s: str) -> str:
-        return (
-            s.replace("&", "&amp;")
-             .replace("<", "&lt;")
-             .replace(">", "&gt;")
-             .replace('"', "&quot;")
-             .replace("'", "&#39;")
-        )
 
-    def _css(self) -> str:
-        return """
-        QWidget { font-size: 11pt; }
-        QLabel#title { font-size: 16pt; font-weight: 700; margin-bottom: 4px; }
-        QLabel#sectionTitle { font-size: 12pt; font-weight: 650; margin-top: 6px; }
-        QLabel#addr { font-family: monospace; font-size: 11pt; padding: 8px 10px; border-radius: 10px; background: rgba(148,163,184,0.12); }
-        QLabel#uptime { color: rgba(226,232,240,0.85); }
-        QPushButton { padding: 8px 12px; border-radius: 10px; background: rgba(148,163,184,0.14); border: 1px solid rgba(148,163,184,0.20); }
-        QPushButton:hover { background: rgba(148,163,184,0.22); }
-        QPushButton:disabled { opacity: 0.45; }
-        QListWidget#clientsList { border-radius: 12px; padding: 8px; border: 1px solid rgba(148,163,184,0.18); background: rgba(2,6,23,0.15); }
-        QListWidget#clientsList::item { padding: 6px 8px; border-radius: 8px; }
-        QListWidget#clientsList::item:selected { background: rgba(96,165,250,0.25); }
-        QTextEdit#log { border-radius: 12px; padding: 10px; border: 1px solid rgba(148,163,184,0.18); background: rgba(2,6,23,0.15); }
-        QLineEdit { padding: 8px 10px; border-radius: 10px; border: 1px solid rgba(148,163,184,0.20); background: rgba(2,6,23,0.25); }
-        QLineEdit:focus { border: 1px solid #60a5fa; }
-        QToolButton { padding: 4px 8px; border-radius: 8px; background: rgba(148,163,184,0.14); border: 1px solid rgba(148,163,184,0.20); }
-        QToolButton:hover { background: rgba(148,163,184,0.22); }
-        """
-
-
-class ClientBridge(QObject):
-    line = Signal(str)
+class ClientPage(QWidget):
+    line_received = Signal(str)
     disconnected = Signal(str)
-    users = Signal(list)
+    users_received = Signal(list)
 
-
-class ClientPage(QWidget):
     def __init__(self, go_back):
         super().__init__()
+        self.setObjectName("clientPage")
         self._go_back_cb = go_back
 
         self.client = NotNetClient()
-        self.bridge = ClientBridge()
 
-        self.client.on_line = lambda line: self.bridge.line.emit(line)
-        self.client.on_disconnect = lambda reason: self.bridge.disconnected.emit(reason)
-        self.client.on_clients = lambda users: self.bridge.users.emit(users)
+        self.client.on_line = self.line_received.emit
+        self.client.on_disconnect = self.disconnected.emit
+        self.client.on_clients = self.users_received.emit
 
-        self.bridge.line.connect(self._append_chat_line)
-        self.bridge.disconnected.connect(self._on_disconnected)
-        self.bridge.users.connect(self._set_users)
+        self.line_received.connect(self._append_chat_line, Qt.QueuedConnection)
+        self.disconnected.connect(self._on_disconnected, Qt.QueuedConnection)
+        self.users_received.connect(self._set_users, Qt.QueuedConnection)
 
         self._messages_sent = 0
         self._messages_received = 0
         self._connected = False
 
+        self._chat_buf = []
+        self._chat_flush_pending = False
+        self._pending_users = None
+        self._cf_cache = {}
+
         root = QVBoxLayout(self)
         root.setSpacing(12)
         root.setContentsMargins(24, 24, 24, 24)
@@ -501,12 +672,11 @@ class ClientPage(QWidget):
         root.addWidget(self.views, 1)
 
         self._build_connect_view()
-        self._build_chat_view()
-
         self.views.addWidget(self.connect_view)
-        self.views.addWidget(self.chat_view)
 
-        self.setStyleSheet(self._css())
+        # чат-вью строим при первом подключении
+        self.chat_view = None
+
         self._show_connect_view()
 
     def ensure_view(self):
@@ -549,6 +719,7 @@ class ClientPage(QWidget):
 
         self.input_username = QLineEdit()
         self.input_username.setPlaceholderText("Username")
+        self.input_username.setMaxLength(MAX_USERNAME)
 
         self.input_ip.returnPressed.connect(self._try_connect)
         self.input_port.returnPressed.connect(self._try_connect)
@@ -594,6 +765,7 @@ class ClientPage(QWidget):
         self.chat_log.setObjectName("log")
         self.chat_log.setReadOnly(True)
         self.chat_log.setAcceptRichText(True)
+        self.chat_log.document().setMaximumBlockCount(LOG_MAX_LINES)
         left.addWidget(self.chat_log, 1)
 
         send_row = QHBoxLayout()
@@ -655,16 +827,25 @@ class ClientPage(QWidget):
 
     def _show_connect_view(self):
         self.views.setCurrentWidget(self.connect_view)
+        self._messages_sent = 0
+        self._messages_received = 0
+        self._connected = False
+        self._chat_buf.clear()
+        self._pending_users = None
+
+        if self.chat_view is None:
+            return
+
         self.input_message.clear()
         self.list_users.clear()
         self.chat_log.clear()
-        self._messages_sent = 0
-        self._messages_received = 0
         self._update_stats()
-        self._connected = False
         self.lbl_status.setText("Status: offline")
 
     def _show_chat_view(self):
+        if self.chat_view is None:
+            self._build_chat_view()
+            self.views.addWidget(self.chat_view)
         self.views.setCurrentWidget(self.chat_view)
         self.input_message.setFocus()
 
@@ -709,12 +890,13 @@ class ClientPage(QWidget):
         self.btn_connect.setEnabled(True)
         self._connected = True
 
+        self._show_chat_view()
+
         self.lbl_addr.setText(f"{ip}:{port}")
         self.lbl_self.setText(f"You: {username}")
         self.lbl_status.setText("Status: connected")
         self._update_stats()
 
-        self._show_chat_view()
         self._append_system_line(f"Connected to {ip}:{port}")
 
     def _logout(self):
@@ -752,19 +934,40 @@ class ClientPage(QWidget):
         self.input_message.clear()
 
     def _set_users(self, users):
+        scheduled = self._pending_users is not None
+        self._pending_users = users
+        if not scheduled:
+            QTimer.singleShot(50, self._flush_users)
+
+    def _flush_users(self):
+        users = self._pending_users
+        self._pending_users = None
+        if users is None:
+            return
+
         current = self.list_users.currentItem().text() if self.list_users.currentItem() else None
-        self.list_users.clear()
 
         me = (self.client.username or "").casefold()
+        cf_cache = self._cf_cache
+        if len(cf_cache) > 1024:
+            cf_cache.clear()
+
+        labels = []
         for username in users:
-            label = username
-            if str(username).casefold() == me:
-                label = f"{username} (you)"
-            item = QListWidgetItem(label)
+            cf = cf_cache.get(username)
+            if cf is None:
+                cf = cf_cache[username] = str(username).casefold()
+            labels.append(f"{username} (you)" if cf == me else username)
+
+        self.list_users.setUpdatesEnabled(False)
+        self.list_users.clear()
+        self.list_users.addItems(labels)
+        for row, username in enumerate(users):
+            item = self.list_users.item(row)
             item.setData(Qt.UserRole, username)
-            self.list_users.addItem(item)
-            if current and label == current:
+            if current and labels[row] == current:
                 item.setSelected(True)
+        self.list_users.setUpdatesEnabled(True)
 
     def _append_chat_line(self, line: str):
         if not self._connected:
@@ -773,108 +976,52 @@ class ClientPage(QWidget):
         self._messages_received += 1
         self._update_stats()
 
-        ts = time.strftime("%H:%M:%S", time.localtime())
+        ts = _fmt_ts()
         text = line.strip()
 
+        user, sep, msg_text = text.partition(":")
         if text.startswith("* "):
             color = "#f59e0b"
-            msg = self._esc(text)
-        elif ":" in text:
-            user, msg_text = text.split(":", 1)
-            user = self._esc(user.strip())
-            msg_text = self._esc(msg_text.lstrip())
+            msg = _esc(text)
+        elif sep:
+            user = _esc(user.rstrip())
+            msg_text = _esc(msg_text.lstrip())
             color = "#cbd5e1"
             msg = f'<span style="color:#60a5fa; font-weight:600;">{user}</span><span style="color:#64748b;">:</span> {msg_text}'
         else:
             color = "#cbd5e1"
-            msg = self._esc(text)
+            msg = _esc(text)
 
         line_html = (
             f'<span style="color:#64748b;">[{ts}]</span> '
             f'<span style="color:{color};">{msg}</span>'
         )
-
-        self.chat_log.moveCursor(QTextCursor.End)
-        self.chat_log.insertHtml(line_html)
-        self.chat_log.insertPlainText("\n")
-        self.chat_log.moveCursor(QTextCursor.End)
+        self._queue_chat_html(line_html)
 
     def _append_system_line(self, text: str):
-        ts = time.strftime("%H:%M:%S", time.localtime())
+        ts = _fmt_ts()
         line_html = (
             f'<span style="color:#64748b;">[{ts}]</span> '
-            f'<span style="color:#94a3b8;">{self._esc(text)}</span>'
+            f'<span style="color:#94a3b8;">{_esc(text)}</span>'
         )
-        self.chat_log.moveCursor(QTextCursor.End)
-        self.chat_log.insertHtml(line_html)
-        self.chat_log.insertPlainText("\n")
-        self.chat_log.moveCursor(QTextCursor.End)
+        self._queue_chat_html(line_html)
 
-    def _update_stats(self):
-        self.lbl_stats.setText(f"Sent: {self._messages_sent} · Received: {self._messages_received}")
+    def _queue_chat_html(self, line_html: str):
+        self._chat_buf.append(line_html)
+        if not self._chat_flush_pending:
+            self._chat_flush_pending = True
+            QTimer.singleShot(16, self._flush_chat)
 
-    def _esc(self, s: str) -> str:
-        return (
-            s.replace("&", "&amp;")
-             .replace("<", "&lt;")
-             .replace(">", "&gt;")
-             .replace('"', "&quot;")
-             .replace("'", "&#39;")
-        )
+    def _flush_chat(self):
+        self._chat_flush_pending = False
+        if not self._chat_buf:
+            return
+        html = _html_paragraphs(self._chat_buf)
+        self._chat_buf.clear()
+        _append_html(self.chat_log, html)
 
-    def _css(self) -> str:
-        return """
-        QWidget { font-size: 11pt; }
-        QLabel#title { font-size: 16pt; font-weight: 700; margin-bottom: 4px; }
-        QLabel#sectionTitle { font-size: 12pt; font-weight: 650; margin-top: 6px; }
-        QLabel#addr {
-            font-family: monospace;
-            font-size: 11pt;
-            padding: 8px 10px;
-            border-radius: 10px;
-            background: rgba(148,163,184,0.12);
-        }
-        QLabel#muted { color: rgba(226,232,240,0.78); }
-        QWidget#connectCard {
-            border-radius: 14px;
-            border: 1px solid rgba(148,163,184,0.18);
-            background: rgba(2,6,23,0.15);
-        }
-        QPushButton {
-            padding: 8px 12px;
-            border-radius: 10px;
-            background: rgba(148,163,184,0.14);
-            border: 1px solid rgba(148,163,184,0.20);
-        }
-        QPushButton:hover { background: rgba(148,163,184,0.22); }
-        QPushButton:disabled { opacity: 0.45; }
-        QListWidget#clientsList {
-            border-radius: 12px;
-            padding: 8px;
-            border: 1px solid rgba(148,163,184,0.18);
-            background: rgba(2,6,23,0.15);
-        }
-        QListWidget#clientsList::item {
-            padding: 6px 8px;
-            border-radius: 8px;
-        }
-        QListWidget#clientsList::item:selected {
-            background: rgba(96,165,250,0.25);
-        }
-        QTextEdit#log {
-            border-radius: 12px;
-            padding: 10px;
-            border: 1px solid rgba(148,163,184,0.18);
-            background: rgba(2,6,23,0.15);
-        }
-        QLineEdit {
-            padding: 8px 10px;
-            border-radius: 10px;
-            border: 1px solid rgba(148,163,184,0.20);
-            background: rgba(2,6,23,0.25);
-        }
-        QLineEdit:focus { border: 1px solid #60a5fa; }
-        """
+    def _update_stats(self):
+        self.lbl_stats.setText(f"Sent: {self._messages_sent} · Received: {self._messages_received}")
 
 class SettingsBridge(QObject):
     latest = Signal(str)
@@ -954,33 +1101,17 @@ class MainWindow(QMainWindow):
         self.setMinimumSize(520, 360)
 
         self.setFont(QFont("JetBrains Mono", 11))
-        self.setStyleSheet("""
-            QWidget {
-                background-color: #0f1115;
-                color: #e6edf3;
-                font-family: "JetBrains Mono";
-                font-size: 11pt;
-            }
-            QPushButton {
-                background-color: #161b22;
-                border: 1px solid #30363d;
-                border-radius: 8px;
-                padding: 12px;
-            }
-            QPushButton:hover { background-color: #1f242d; }
-            QPushButton:pressed { background-color: #0d1117; }
-        """)
+        QApplication.instance().setStyleSheet(APP_QSS)
 
         self.stack = QStackedWidget()
         self.setCentralWidget(self.stack)
 
         self.start_page = StartPage(self.show_server, self.show_client, self.show_settings)
-        self.server_page = ServerPage(self.show_start)
+        self.server_page = None
         self.client_page = ClientPage(self.show_start)
         self.settings_page = SettingsPage(self.show_start)
 
         self.stack.addWidget(self.start_page)
-        self.stack.addWidget(self.server_page)
         self.stack.addWidget(self.client_page)
         self.stack.addWidget(self.settings_page)
 
@@ -991,6 +1122,8 @@ class MainWindow(QMainWindow):
         if not w:
             return
 
+        # стили применяются при polish — без него sizeHint не учтёт паддинги
+        w.ensurePolished()
         hint = w.sizeHint()
         ww = max(hint.width() + 40, self.minimumWidth())
         hh = max(hint.height() + 40, self.minimumHeight())
@@ -1000,20 +1133,23 @@ class MainWindow(QMainWindow):
 
     def show_start(self):
         self.stack.setCurrentWidget(self.start_page)
-        QTimer.singleShot(0, self._fit_to_current_page)
+        self._fit_to_current_page()
 
     def show_server(self):
+        if self.server_page is None:
+            self.server_page = ServerPage(self.show_start)
+            self.stack.addWidget(self.server_page)
         self.stack.setCurrentWidget(self.server_page)
-        QTimer.singleShot(0, self._fit_to_current_page)
+        self._fit_to_current_page()
 
     def show_client(self):
         self.client_page.ensure_view()
         self.stack.setCurrentWidget(self.client_page)
-        QTimer.singleShot(0, self._fit_to_current_page)
+        self._fit_to_current_page()
 
     def show_settings(self):
         self.stack.setCurrentWidget(self.settings_page)
-        QTimer.singleShot(0, self._fit_to_current_page)
+        self._fit_to_current_page()
 
 
     def get_latest_version(self):
@@ -1059,11 +1195,15 @@ class MainWindow(QMainWindow):
         except Exception:
             pass
 
-        try:
-            if self.server_page.server.running:
-                self.server_page.server.stop()
-        except Exception:
-            pass
+        page = self.server_page
+        if page is not None:
+            try:
+                if page.server.running:
+                    page.server.stop()
+                page.server_thread.quit()
+                page.server_thread.wait(2000)
+            except Exception:
+                pass
 
         super().closeEvent(event)
 
@@ -1,15 +1,27 @@
 import socket
 import threading
-import json
 from typing import Callable, Optional
 
 from .protocol import (
     encode_line,
     split_lines,
+    DELIMITER_BYTES,
+    HANDSHAKE_LIMIT,
+    MAX_LINE,
+    MAX_USERNAME,
+    decode_line,
+    load_json,
     PROTOCOL_VERSION,
+    RECV_SIZE,
     make_hello,
 )
 
+_KICK = b"@KICK"
+_SERVER_CLOSED = b"@SERVER_CLOSED"
+_CLIENTS_PREFIX = b"@CLIENTS "
+_OK = b"@OK"
+_ERR_PREFIX = b"@ERR "
+
 
 class NotNetClient:
     def __init__(self):
@@ -18,10 +30,20 @@ class NotNetClient:
 
         self._running = False
         self._receiver_thread: Optional[threading.Thread] = None
-        self._buffer = ""
+        self._buffer = bytearray()
+        self._recv_buf = bytearray(RECV_SIZE)
+        self._recv_view = memoryview(self._recv_buf)
         self._disconnect_reason = "connection lost"
         self._disconnect_notified = False
         self._close_lock = threading.Lock()
+        self._last_clients_payload: Optional[bytes] = None
+
+        # точные служебные строки -> обработчик
+        self._control = {
+            _KICK: self._on_kick,
+            _SERVER_CLOSED: self._on_server_closed,
+            _OK: self._on_ack,
+        }
 
         self.on_line: Optional[Callable[[str], None]] = None
         self.on_disconnect: Optional[Callable[[str], None]] = None
@@ -38,6 +60,8 @@ class NotNetClient:
         username = username.strip()
         if not username:
             raise ValueError("Username is empty")
+        if len(username) > MAX_USERNAME:
+            raise ValueError(f"Username is too long (max {MAX_USERNAME} characters)")
 
         s = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
         s.settimeout(5.0)
@@ -48,16 +72,8 @@ class NotNetClient:
 
         self.sock.sendall(encode_line(make_hello(PROTOCOL_VERSION)))
 
-        handshake_buffer = ""
-        while "\n" not in handshake_buffer:
-            data = self.sock.recv(1024)
-            if not data:
-                raise ConnectionError("Server closed connection during handshake")
-            handshake_buffer += data.decode("utf-8", errors="replace")
-
-        line, rest = handshake_buffer.split("\n", 1)
-        line = line.strip()
-        handshake_buffer = rest
+        handshake_buffer = bytearray()
+        line = self._recv_handshake_line(handshake_buffer)
 
         if line.startswith("ERR PROTOCOL_MISMATCH"):
             self._force_close()
@@ -69,15 +85,8 @@ class NotNetClient:
 
         self.sock.sendall(encode_line(self.username))
 
-        while "\n" not in handshake_buffer:
-            data = self.sock.recv(1024)
-            if not data:
-                raise ConnectionError("Server closed connection during handshake")
-            handshake_buffer += data.decode("utf-8", errors="replace")
-
-        line, rest = handshake_buffer.split("\n", 1)
-        line = line.strip()
-        self._buffer = rest
+        line = self._recv_handshake_line(handshake_buffer)
+        self._buffer = handshake_buffer
 
         if line.startswith("@ERR "):
             code = line[5:].strip()
@@ -89,6 +98,8 @@ class NotNetClient:
                 raise ValueError("Username already in use")
             if code == "username_empty":
                 raise ValueError("Username is empty")
+            if code == "username_too_long":
+                raise ValueError(f"Username is too long (max {MAX_USERNAME} characters)")
             if code == "bad_hello":
                 raise ConnectionError("Bad protocol hello")
             raise ConnectionError(f"Server rejected connection: {code}")
@@ -102,17 +113,43 @@ class NotNetClient:
         self._running = True
         self._disconnect_notified = False
         self._disconnect_reason = "connection lost"
-        self._buffer = self._buffer or ""
+        self._last_clients_payload = None
 
         self._receiver_thread = threading.Thread(target=self._receiver_loop, daemon=True)
         self._receiver_thread.start()
 
+    def _recv_handshake_line(self, buffer: bytearray) -> str:
+        # \n ищем только в новых байтах, декодируем один раз
+        pos = 0
+        while True:
+            idx = buffer.find(DELIMITER_BYTES, pos)
+            if idx >= 0:
+                break
+            if len(buffer) > HANDSHAKE_LIMIT:
+                self._force_close()
+                raise ConnectionError("Invalid server handshake response")
+
+            pos = len(buffer)
+            n = self.sock.recv_into(self._recv_view)
+            if not n:
+                raise ConnectionError("Server closed connection during handshake")
+            buffer += self._recv_view[:n]
+
+        with memoryview(buffer) as view:
+            raw_line = view[:idx].tobytes()
+        del buffer[:idx + 1]
+        return decode_line(raw_line).strip()
+
     def send(self, text: str):
         if not self._running or not self.sock:
             raise RuntimeError("Client is not connected")
 
         msg = text.rstrip("\n")
-        self.sock.sendall(encode_line(msg))
+        data = encode_line(msg)
+        # сервер отключает за строки длиннее MAX_LINE байт
+        if len(data) > MAX_LINE + 1:
+            raise ValueError(f"Message is too long (max {MAX_LINE} bytes)")
+        self.sock.sendall(data)
 
     def disconnect(self, reason: str = "connection lost"):
         self._disconnect_reason = reason
@@ -135,57 +172,77 @@ class NotNetClient:
             except OSError:
                 pass
 
-    def _handle_protocol_line(self, line: str) -> bool:
-        if line == "@KICK":
-            self.disconnect("kicked by server")
-            return True
+    def _on_kick(self) -> bool:
+        self.disconnect("kicked by server")
+        return True
 
-        if line == "@SERVER_CLOSED":
-            self.disconnect("server closed")
-            return True
+    def _on_server_closed(self) -> bool:
+        self.disconnect("server closed")
+        return True
 
-        if line.startswith("@CLIENTS "):
-            payload = line[len("@CLIENTS "):].strip()
-            try:
-                data = json.loads(payload)
-                if isinstance(data, list) and self.on_clients:
-                    self.on_clients([str(x) for x in data])
-            except Exception:
-                pass
-            return True
+    def _on_ack(self) -> bool:
+        return True
 
-        if line == "@OK" or line.startswith("@ERR "):
+    def _on_clients_payload(self, payload: bytes) -> bool:
+        payload = payload.strip()
+        # тот же состав — не парсим json повторно
+        if payload == self._last_clients_payload:
             return True
+        self._last_clients_payload = payload
+        try:
+            data = load_json(payload)
+            if isinstance(data, list) and self.on_clients:
+                self.on_clients([str(x) for x in data])
+        except Exception:
+            pass
+        return True
+
+    def _handle_protocol_line(self, line: bytes) -> bool:
+        # обычные сообщения чата не начинаются с '@' — сразу мимо
+        if not line.startswith(b"@"):
+            return False
+
+        handler = self._control.get(line)
+        if handler is not None:
+            return handler()
 
-        return False
+        if line.startswith(_CLIENTS_PREFIX):
+            return self._on_clients_payload(line[len(_CLIENTS_PREFIX):])
+
+        return line.startswith(_ERR_PREFIX)
 
     def _receiver_loop(self):
         reason = "connection lost"
 
         try:
-            while self._running:
-                s = self.sock
-                if s is None:
-                    break
-
-                if "\n" not in self._buffer:
-                    data = s.recv(1024)
-                    if not data:
-                        reason = "connection lost"
-                        break
-                    self._buffer += data.decode("utf-8", errors="replace")
+            s = self.sock
+            if s is None:
+                return
+            # горячий цикл: атрибуты один раз в локальные имена
+            buffer = self._buffer
+            recv_view = self._recv_view
+            handle = self._handle_protocol_line
+            on_line = self.on_line
+            scan_from = 0
 
-                lines, self._buffer = split_lines(self._buffer)
-                for line in lines:
-                    if self._handle_protocol_line(line):
+            while self._running:
+                # сначала разбираем то, что уже лежит в буфере (в т.ч. после хендшейка)
+                for raw_line in split_lines(buffer, scan_from):
+                    if handle(raw_line):
                         reason = self._disconnect_reason
                         if not self._running:
                             return
                         continue
 
-                    cb = self.on_line
-                    if cb:
-                        cb(line)
+                    if on_line:
+                        on_line(decode_line(raw_line))
+
+                n = s.recv_into(recv_view)
+                if not n:
+                    reason = "connection lost"
+                    break
+                scan_from = len(buffer)
+                buffer += recv_view[:n]
 
         except Exception:
             reason = "connection lost"
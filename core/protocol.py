@@ -1,19 +1,70 @@
+import json
+from typing import List
+
+try:
+    import orjson
+except ImportError:  # необязательная зависимость
+    orjson = None
+
 DELIMITER = "\n"
+DELIMITER_BYTES = DELIMITER.encode("utf-8")
 
 PROTOCOL_VERSION = 1
+# за один recv вычитываем до 64 КиБ — порядка окна приёма TCP
+RECV_SIZE = 65536
 HELLO_PREFIX = "HELLO"
+# строки хендшейка короткие; длиннее — заведомо мусор
+HANDSHAKE_LIMIT = 256
+# ограничения на строку чата (в байтах, без \n) и на имя (в символах)
+MAX_LINE = 2048
+MAX_USERNAME = 32
 
 
 def encode_line(text: str) -> bytes:
     return (text + DELIMITER).encode("utf-8")
 
 
-def split_lines(buffer: str):
-    lines = []
-    while DELIMITER in buffer:
-        line, buffer = buffer.split(DELIMITER, 1)
-        lines.append(line)
-    return lines, buffer
+def dump_json(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def load_json(data: bytes):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+# служебные ответы и команды сервера, кодируются один раз
+OK_RESPONSE = encode_line("@OK")
+ERR_USERNAME_TAKEN = encode_line("@ERR username_taken")
+ERR_USERNAME_RESERVED = encode_line("@ERR username_reserved")
+ERR_USERNAME_EMPTY = encode_line("@ERR username_empty")
+ERR_USERNAME_TOO_LONG = encode_line("@ERR username_too_long")
+ERR_BAD_HELLO = encode_line("@ERR bad_hello")
+KICK_BYTES = encode_line("@KICK")
+SERVER_CLOSED_BYTES = encode_line("@SERVER_CLOSED")
+
+
+def decode_line(raw: bytes) -> str:
+    # чистый ASCII декодируется без UTF-8 автомата и без подстановок
+    if raw.isascii():
+        return raw.decode("ascii")
+    return raw.decode("utf-8", errors="replace")
+
+
+def split_lines(buffer: bytearray, start: int = 0) -> List[bytes]:
+    # все полные строки (bytes, без \n) за один проход bytes.split в C;
+    # недописанный хвост остаётся в buffer до следующего recv.
+    # start — с какого места искать \n: в старом хвосте его заведомо нет
+    end = buffer.rfind(DELIMITER_BYTES, start)
+    if end < 0:
+        return []
+    with memoryview(buffer) as view:
+        chunk = view[:end].tobytes()
+    del buffer[:end + 1]
+    return chunk.split(DELIMITER_BYTES)
 
 
 def make_hello(version: int = PROTOCOL_VERSION) -> str:
@@ -28,9 +79,23 @@ def parse_hello(line: str) -> int:
     return int(parts[1])
 
 
+_HELLO_CURRENT = make_hello(PROTOCOL_VERSION).encode("ascii")
+
+
+def parse_hello_bytes(line: bytes) -> int:
+    # обычный "HELLO <текущая версия>" узнаём по байтам без decode и split;
+    # всё остальное разбирает parse_hello с прежними правилами пробелов
+    if line.strip() == _HELLO_CURRENT:
+        return PROTOCOL_VERSION
+    return parse_hello(decode_line(line))
+
+
 def make_protocol_mismatch(server_version: int, client_version: int) -> str:
     return f"ERR PROTOCOL_MISMATCH server={server_version} client={client_version}"
 
 
 def make_protocol_ok(server_version: int) -> str:
-    return f"OK PROTOCOL {server_version}"
\ No newline at end of file
+    return f"OK PROTOCOL {server_version}"
+
+
+PROTOCOL_OK_RESPONSE = encode_line(make_protocol_ok(PROTOCOL_VERSION))
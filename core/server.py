@@ -1,26 +1,118 @@
 import socket
-import threading
+import selectors
 import time
-import json
-from typing import Callable, Dict, List, Optional, Tuple
+from collections import deque
+from contextlib import suppress
+from itertools import islice
+from typing import Callable, Dict, List, Optional, Set, Tuple
 
 from .protocol import (
     PROTOCOL_VERSION,
+    RECV_SIZE,
+    HANDSHAKE_LIMIT,
+    MAX_LINE,
+    MAX_USERNAME,
+    OK_RESPONSE,
+    ERR_USERNAME_TAKEN,
+    ERR_USERNAME_RESERVED,
+    ERR_USERNAME_EMPTY,
+    ERR_USERNAME_TOO_LONG,
+    ERR_BAD_HELLO,
+    PROTOCOL_OK_RESPONSE,
+    KICK_BYTES,
+    SERVER_CLOSED_BYTES,
     encode_line,
+    DELIMITER_BYTES,
+    dump_json,
     split_lines,
-    parse_hello,
-    make_protocol_ok,
+    decode_line,
+    parse_hello_bytes,
     make_protocol_mismatch,
 )
 
+# входы/выходы в пределах этого окна дают одно обновление списка
+CLIENTS_DEBOUNCE = 0.05
+# медленный клиент копит данные в ядре, а не в нашей очереди
+SEND_BUF_SIZE = 1 << 20
+# чтобы один recv_into на RECV_SIZE забирал пачку строк от активного клиента
+RECV_BUF_SIZE = 256 * 1024
+# на Linux мёртвый пир не должен присылать SIGPIPE; на Windows флага нет
+_SEND_FLAGS = getattr(socket, "MSG_NOSIGNAL", 0)
+# очередь входящих соединений (максимум, что разрешает ОС)
+# и сколько из неё забираем за одно событие
+LISTEN_BACKLOG = socket.SOMAXCONN
+ACCEPT_BATCH = 64
+# рассылка кладёт в очередь клиента ссылку на общий payload, без копии;
+# очередь уходит одним sendmsg (на Windows его нет — склеиваем и send)
+_HAS_SENDMSG = hasattr(socket.socket, "sendmsg")
+# больше буферов за один sendmsg ядро не примет (IOV_MAX)
+_MAX_IOV = 1024
+# столько буферов может ждать в очереди клиента (строка — это два буфера);
+# кто не успевает разгребать, того отключаем, а не копим память
+MAX_OUTQ_ITEMS = 4096
+# и столько байт сверх того, что уже взяло ядро
+MAX_OUTQ_BYTES = 4 * 1024 * 1024
+
+
+def _safe_close(sock: socket.socket, shutdown: bool = False):
+    # уже закрытый сокет не трогаем — без лишнего исключения на частом пути
+    if sock.fileno() == -1:
+        return
+    with suppress(OSError):
+        if shutdown:
+            sock.shutdown(socket.SHUT_RDWR)
+    with suppress(OSError):
+        sock.close()
+
+
+class _ClientState:
+    __slots__ = ("sock", "addr", "stage", "username", "name_key", "prefix", "inbuf", "outq", "outq_bytes", "want_write")
+
+    def __init__(self, sock: socket.socket, addr):
+        self.sock = sock
+        self.addr = addr
+        # hello -> username -> chat
+        self.stage = "hello"
+        self.username: Optional[str] = None
+        self.name_key: Optional[str] = None
+        # "username: " в байтах, собирается один раз при входе
+        self.prefix = b""
+        self.inbuf = bytearray()
+        self.outq = deque()
+        self.outq_bytes = 0
+        self.want_write = False
+
+
 class NotNetServer:
     def __init__(self, host: str = "0.0.0.0", port: int = 55555):
         self.host = host
         self.port = port
 
         self.server_socket: Optional[socket.socket] = None
-        self.clients: Dict[socket.socket, Tuple[str, Tuple[str, int]]] = {}
-        self._lock = threading.Lock()
+        self.clients: Dict[socket.socket, _ClientState] = {}
+        # casefold(username) -> сокет, для O(1) проверки занятости и kick
+        self._by_name: Dict[str, socket.socket] = {}
+        # сокеты трогает только поток цикла; вызовы из UI (broadcast/kick)
+        # кладутся в очередь и будят select через socketpair
+        self._calls = deque()
+        self._wake_r: Optional[socket.socket] = None
+        self._wake_w: Optional[socket.socket] = None
+        self._sel: Optional[selectors.BaseSelector] = None
+        self._dirty: Set[_ClientState] = set()
+
+        # список клиентов пересобирается только при смене состава
+        self._clients_gen = 0
+        self._clients_cache_gen = -1
+        self._clients_items: List[Tuple[str, str]] = []
+        self._clients_frame = b""
+        self._emitted_gen = 0
+        self._clients_due: Optional[float] = None
+        self._peers_cache: Tuple[_ClientState, ...] = ()
+        self._peers_gen = 0
+        self._last_emit_at = 0.0
+
+        self._recv_buf = bytearray(RECV_SIZE)
+        self._recv_view = memoryview(self._recv_buf)
         self._running = False
         self._started_at: Optional[float] = None
 
@@ -42,21 +134,33 @@ class NotNetServer:
         else:
             print(text)
 
-    def _send_line(self, conn: socket.socket, line: str):
-        conn.sendall(encode_line(line))
-
     def _collect_clients_for_ui(self) -> List[Tuple[str, str]]:
-        with self._lock:
-            items = [(u, f"{a[0]}:{a[1]}") for _, (u, a) in self.clients.items()]
-        items.sort(key=lambda x: x[0].lower())
-        return items
+        if self._clients_cache_gen != self._clients_gen:
+            items = [(st.username, f"{st.addr[0]}:{st.addr[1]}") for st in self.clients.values()]
+            items.sort(key=lambda x: x[0].lower())
+            usernames = [u for u, _ in items]
+            self._clients_items = items
+            self._clients_frame = b"@CLIENTS " + dump_json(usernames) + DELIMITER_BYTES
+            self._clients_cache_gen = self._clients_gen
+        return self._clients_items
+
+    def _peers(self) -> Tuple[_ClientState, ...]:
+        # неизменяемый снимок для рассылки, пересобирается только при смене состава
+        if self._peers_gen != self._clients_gen:
+            self._peers_cache = tuple(self.clients.values())
+            self._peers_gen = self._clients_gen
+        return self._peers_cache
 
     def _broadcast_clients_list(self):
-        items = self._collect_clients_for_ui()
-        usernames = [u for u, _ in items]
-        self._broadcast("@CLIENTS " + json.dumps(usernames, ensure_ascii=False))
+        self._collect_clients_for_ui()
+        self._queue_bytes(self._clients_frame)
 
     def _emit_clients(self):
+        self._clients_due = None
+        if self._emitted_gen == self._clients_gen:
+            return
+        self._emitted_gen = self._clients_gen
+        self._last_emit_at = time.monotonic()
         items = self._collect_clients_for_ui()
 
         cb = self.on_clients
@@ -66,43 +170,208 @@ class NotNetServer:
         # отправляем клиентам список пользователей
         self._broadcast_clients_list()
 
-    def _drop_client(self, conn: socket.socket):
-        with self._lock:
-            self.clients.pop(conn, None)
+    def _schedule_clients(self):
+        # первое изменение публикуется сразу, следующие в пределах окна —
+        # одним обновлением в конце окна
+        if self._clients_due is not None:
+            return
+        now = time.monotonic()
+        if now - self._last_emit_at >= CLIENTS_DEBOUNCE:
+            self._emit_clients()
+        else:
+            self._clients_due = self._last_emit_at + CLIENTS_DEBOUNCE
+
+    def _set_write_interest(self, st: _ClientState, enabled: bool):
+        if st.want_write == enabled:
+            return
+        st.want_write = enabled
+        sel = self._sel
+        if sel is None:
+            return
+        events = selectors.EVENT_READ
+        if enabled:
+            events |= selectors.EVENT_WRITE
         try:
-            conn.shutdown(socket.SHUT_RDWR)
-        except OSError:
+            sel.modify(st.sock, events, st)
+        except (KeyError, ValueError, OSError):
             pass
+
+    def _write(self, st: _ClientState, data: bytes) -> bool:
+        # неблокирующая отправка: хвост, который не влез в сокет,
+        # ждёт в outq и дописывается по EVENT_WRITE
+        if st.outq:
+            st.outq.append(data)
+            st.outq_bytes += len(data)
+            self._dirty.add(st)
+            return True
         try:
-            conn.close()
+            sent = st.sock.send(data, _SEND_FLAGS)
+        except BlockingIOError:
+            sent = 0
         except OSError:
-            pass
-
-    def _broadcast(self, line: str, exclude: Optional[socket.socket] = None):
-        data = encode_line(line)
+            return False
+        if sent < len(data):
+            rest = memoryview(data)[sent:]
+            st.outq.append(rest)
+            st.outq_bytes += len(rest)
+            self._set_write_interest(st, True)
+        return True
 
-        with self._lock:
-            conns = list(self.clients.keys())
+    def _flush_outq(self, st: _ClientState) -> bool:
+        # шлём, пока ядро забирает пачку целиком; остановились с непустой
+        # очередью — значит сокет упёрся (EAGAIN или короткий send)
+        q = st.outq
+        while q:
+            try:
+                if _HAS_SENDMSG:
+                    if len(q) <= _MAX_IOV:
+                        bufs = q
+                        batch = st.outq_bytes
+                    else:
+                        bufs = list(islice(q, _MAX_IOV))
+                        batch = sum(map(len, bufs))
+                    sent = st.sock.sendmsg(bufs, (), _SEND_FLAGS)
+                else:
+                    if len(q) > 1:
+                        joined = b"".join(q)
+                        q.clear()
+                        q.append(joined)
+                    batch = len(q[0])
+                    sent = st.sock.send(q[0], _SEND_FLAGS)
+            except BlockingIOError:
+                break
+            except OSError:
+                return False
+
+            st.outq_bytes -= sent
+            rest = sent
+            while rest:
+                head = q[0]
+                if rest < len(head):
+                    q[0] = memoryview(head)[rest:]
+                    break
+                rest -= len(head)
+                q.popleft()
+            if sent < batch:
+                break
+        self._set_write_interest(st, bool(q))
+        return True
 
-        dead = []
-        for conn in conns:
-            if conn is exclude:
+    def _send_control(self, st: _ClientState, data: bytes):
+        # служебный кадр встаёт в общую очередь клиента, чтобы не врезаться
+        # в недосланную строку; сразу пытаемся протолкнуть её в сокет
+        if self._write(st, data) and st.outq:
+            self._flush_outq(st)
+
+    def _flush_dirty(self):
+        # всё, что накопилось за проход цикла, уходит одним вызовом на клиента
+        while self._dirty:
+            dirty = self._dirty
+            self._dirty = set()
+
+            dead = []
+            slow = []
+            for st in dirty:
+                if st.sock.fileno() == -1:
+                    continue
+                if not self._flush_outq(st):
+                    dead.append(st)
+                # медленный — только если ядро уже отказалось брать данные
+                # (want_write остался взведён), а очередь всё равно переполнена
+                elif st.want_write and (
+                    len(st.outq) > MAX_OUTQ_ITEMS or st.outq_bytes > MAX_OUTQ_BYTES
+                ):
+                    slow.append(st)
+            if not dead and not slow:
                 continue
+
+            for st in dead + slow:
+                self._drop_client(st.sock)
+            self._schedule_clients()
+            for st in dead:
+                if st.username:
+                    self._emit_log(f"[-] {st.username} disconnected", "disconnect")
+            for st in slow:
+                if st.username:
+                    self._emit_log(f"[-] {st.username} disconnected (too slow)", "disconnect")
+
+    def _drop_client(self, conn: socket.socket):
+        st = self.clients.pop(conn, None)
+        if st is not None:
+            self._dirty.discard(st)
+            self._by_name.pop(st.name_key, None)
+            self._clients_gen += 1
+        sel = self._sel
+        if sel is not None:
             try:
-                conn.sendall(data)
+                sel.unregister(conn)
+            except (KeyError, ValueError):
+                pass
+        _safe_close(conn, shutdown=True)
+
+    def _disconnect(self, st: _ClientState):
+        registered = st.sock in self.clients
+        self._drop_client(st.sock)
+        if registered:
+            self._schedule_clients()
+            self._emit_log(f"[-] {st.username} disconnected", "disconnect")
+
+    def _queue_broadcast(self, line: str):
+        self._queue_payload(line.encode("utf-8"))
+
+    def _queue_payload(self, payload: bytes):
+        # payload без \n: разделитель идёт отдельным буфером того же
+        # sendmsg, так что строку не приходится склеивать ради одного байта
+        size = len(payload) + 1
+        dirty = self._dirty
+        for st in self._peers():
+            q = st.outq
+            q.append(payload)
+            q.append(DELIMITER_BYTES)
+            st.outq_bytes += size
+            dirty.add(st)
+
+    def _queue_bytes(self, data: bytes):
+        dirty = self._dirty
+        for st in self._peers():
+            st.outq.append(data)
+            st.outq_bytes += len(data)
+            dirty.add(st)
+
+    def _call_soon(self, fn: Callable[[], None]):
+        # выполняется в потоке цикла на ближайшем проходе
+        self._calls.append(fn)
+        self._wakeup()
+
+    def _wakeup(self):
+        w = self._wake_w
+        if w is None:
+            return
+        try:
+            w.send(b"\0")
+        except OSError:
+            # буфер полон — цикл и так проснётся
+            pass
+
+    def _drain_wakeup(self):
+        while True:
+            try:
+                if not self._wake_r.recv(4096):
+                    return
             except OSError:
-                dead.append(conn)
+                return
 
-        if dead:
-            for conn in dead:
-                self._drop_client(conn)
-            # важно: один апдейт списка, без рекурсий
-            self._emit_clients()
+    def _run_calls(self):
+        calls = self._calls
+        while calls:
+            calls.popleft()()
+
+    def broadcast(self, line: str):
+        if self._running:
+            self._call_soon(lambda: self._queue_broadcast(line))
 
     def _username_taken(self, username: str) -> bool:
-        target = username.casefold()
-        with self._lock:
-            return any(u.casefold() == target for u, _ in self.clients.values())
+        return username.casefold() in self._by_name
 
     def start(self):
         if self._running:
@@ -113,14 +382,11 @@ class NotNetServer:
 
         try:
             s.bind((self.host, self.port))
-            s.listen()
-            s.settimeout(0.5)
+            s.listen(LISTEN_BACKLOG)
+            s.setblocking(False)
         except OSError as e:
             # важно: не оставляем сокет висеть и не делаем вид, что сервер запущен
-            try:
-                s.close()
-            except OSError:
-                pass
+            _safe_close(s)
 
             self.server_socket = None
             self._running = False
@@ -138,6 +404,17 @@ class NotNetServer:
             self._emit_clients()
             return
 
+        wake_r, wake_w = socket.socketpair()
+        wake_r.setblocking(False)
+        wake_w.setblocking(False)
+
+        sel = selectors.DefaultSelector()
+        sel.register(s, selectors.EVENT_READ)
+        sel.register(wake_r, selectors.EVENT_READ)
+
+        self._sel = sel
+        self._wake_r = wake_r
+        self._wake_w = wake_w
         self.server_socket = s
         self._running = True
         self._started_at = time.time()
@@ -145,207 +422,223 @@ class NotNetServer:
 
         try:
             while self._running:
-                try:
-                    conn, addr = s.accept()
-                except socket.timeout:
-                    continue
-                except OSError:
-                    break
+                # без отложенных дел спим до события; stop() будит через socketpair
+                timeout = None
+                due = self._clients_due
+                if due is not None:
+                    timeout = max(0.0, due - time.monotonic())
+
+                events = sel.select(timeout=timeout)
+                # сначала вычитываем будильник, потом очередь: вызов, пришедший
+                # между ними, оставит свой байт и разбудит следующий select
+                for key, _ in events:
+                    if key.fileobj is wake_r:
+                        self._drain_wakeup()
+                        break
+                self._run_calls()
+                for key, mask in events:
+                    if not self._running:
+                        break
+                    if key.fileobj is s:
+                        self._accept(s)
+                        continue
+                    if key.fileobj is wake_r:
+                        continue
 
-                t = threading.Thread(
-                    target=self._handle_client, args=(conn, addr), daemon=True
-                )
-                t.start()
+                    st = key.data
+                    # сокет мог закрыть kick из очереди на этом же проходе
+                    if st.sock.fileno() == -1:
+                        continue
+                    if mask & selectors.EVENT_WRITE and not self._flush_outq(st):
+                        self._disconnect(st)
+                        continue
+                    if mask & selectors.EVENT_READ:
+                        self._on_readable(st)
+
+                due = self._clients_due
+                if due is not None and time.monotonic() >= due:
+                    self._emit_clients()
+                self._flush_dirty()
         finally:
-            # если поток умер сам — подчистим состояние
             self._running = False
             self._started_at = None
-            if self.server_socket is s:
-                self.server_socket = None
-            try:
-                s.close()
-            except OSError:
-                pass
-            self._emit_clients()
-
-
-    def stop(self):
-        # если сервер не запущен — не пишем "stopped" как будто он реально работал
-        if not self._running and self.server_socket is None:
-            self._emit_log("Server is not running", "info")
-            return
+            self.server_socket = None
 
-        self._running = False
-        self._started_at = None
+            # сначала пытаемся мягко предупредить, затем закрываем всех
+            for st in self.clients.values():
+                self._send_control(st, SERVER_CLOSED_BYTES)
+            for key in list(sel.get_map().values()):
+                if isinstance(key.data, _ClientState):
+                    self._drop_client(key.fileobj)
+
+            self._calls.clear()
+            self._dirty.clear()
+            self._sel = None
+            self._wake_r = None
+            self._wake_w = None
+            sel.close()
+            for sock in (s, wake_r, wake_w):
+                _safe_close(sock)
+            self._emit_clients()
+            self._emit_log("Server stopped", "warn")
 
-        s = self.server_socket
-        self.server_socket = None
-        if s is not None:
-            try:
-                s.shutdown(socket.SHUT_RDWR)
-            except OSError:
-                pass
+    def _accept(self, s: socket.socket):
+        # за одно пробуждение разбираем всю накопившуюся очередь
+        for _ in range(ACCEPT_BATCH):
             try:
-                s.close()
+                conn, addr = s.accept()
             except OSError:
-                pass
-
-        with self._lock:
-            conns = list(self.clients.keys())
+                # в т.ч. BlockingIOError — очередь пуста
+                return
 
-        # сначала пытаемся мягко предупредить
-        for conn in conns:
+            conn.setblocking(False)
             try:
-                self._send_line(conn, "@SERVER_CLOSED")
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, SEND_BUF_SIZE)
+                conn.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECV_BUF_SIZE)
+                # строки и так склеиваются в один send за проход цикла,
+                # Nagle только добавил бы задержку до ACK
+                conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
             except OSError:
                 pass
+            self._sel.register(conn, selectors.EVENT_READ, _ClientState(conn, addr))
 
-        # затем закрываем
-        for conn in conns:
-            self._drop_client(conn)
-
-        self._emit_clients()
-        self._emit_log("Server stopped", "warn")
-        
-    def kick(self, username: str) -> bool:
-        target: Optional[socket.socket] = None
-        with self._lock:
-            for conn, (u, _) in self.clients.items():
-                if u == username:
-                    target = conn
-                    break
-
-        if target is None:
-            return False
-
-        # убрать из списка сразу — чтобы не было гонок и “мнимых” клиентов
-        with self._lock:
-            self.clients.pop(target, None)
-
+    def _on_readable(self, st: _ClientState):
         try:
-            self._send_line(target, "@KICK")
-        except OSError:
-            pass
+            n = st.sock.recv_into(self._recv_view)
+        except (BlockingIOError, InterruptedError):
+            return
+        except OSError as e:
+            self._emit_log(f"[!] client error {st.addr}: {e}", "error")
+            self._disconnect(st)
+            return
 
-        # закрытие
-        try:
-            target.shutdown(socket.SHUT_RDWR)
-        except OSError:
-            pass
-        try:
-            target.close()
-        except OSError:
-            pass
+        if n == 0:
+            self._disconnect(st)
+            return
 
-        self._emit_log(f"[!] {username} kicked", "warn")
-        self._emit_clients()
-        return True
+        scan_from = len(st.inbuf)
+        st.inbuf += self._recv_view[:n]
 
-    def _recv_line_handshake(self, conn: socket.socket, buffer: str = ""):
-        conn.settimeout(None)
+        handle = self._handle_line
+        sock = st.sock
+        try:
+            for raw_line in split_lines(st.inbuf, scan_from):
+                # слишком длинную строку отбрасываем до decode
+                if len(raw_line) > MAX_LINE:
+                    self._drop_oversized(st)
+                    return
+                handle(st, raw_line)
+                if sock.fileno() == -1:
+                    return
+            # до входа в чат строка без \n не может быть длинной
+            if st.stage != "chat":
+                if len(st.inbuf) > HANDSHAKE_LIMIT:
+                    self._reject(st, ERR_BAD_HELLO)
+            elif len(st.inbuf) > MAX_LINE:
+                self._drop_oversized(st)
+        except Exception as e:
+            self._emit_log(f"[!] client error {st.addr}: {e}", "error")
+            self._disconnect(st)
 
-        while "\n" not in buffer:
-            chunk = conn.recv(1024)
-            if not chunk:
-                raise ConnectionError("connection closed during handshake")
-            buffer += chunk.decode("utf-8", errors="replace")
+    def _drop_oversized(self, st: _ClientState):
+        self._emit_log(f"[!] line too long from {st.addr}", "warn")
+        self._disconnect(st)
 
-        line, buffer = buffer.split("\n", 1)
-        return line, buffer
+    def _reject(self, st: _ClientState, data: bytes):
+        self._write(st, data)
+        self._drop_client(st.sock)
 
-    def _handle_client(self, conn: socket.socket, addr):
-        username: Optional[str] = None
-        buffer = ""
+    def _handle_line(self, st: _ClientState, raw_line: bytes):
+        if st.stage == "chat":
+            text = decode_line(raw_line).strip()
+            if not text:
+                return
+            self._emit_log(f"{st.username}: {text}", "chat")
+            # тело строим из того же text, что ушёл в лог: str.strip срезает
+            # больше символов, чем bytes.strip
+            body = text.encode("ascii" if raw_line.isascii() else "utf-8")
+            self._queue_payload(st.prefix + body)
+            return
 
-        try:
-            hello_line, buffer = self._recv_line_handshake(conn)
+        if st.stage == "hello":
             try:
-                client_ver = parse_hello((hello_line or "").strip())
+                client_ver = parse_hello_bytes(raw_line)
             except Exception:
-                try:
-                    self._send_line(conn, "@ERR bad_hello")
-                except OSError:
-                    pass
-                self._drop_client(conn)
+                self._reject(st, ERR_BAD_HELLO)
                 return
 
             if client_ver != PROTOCOL_VERSION:
-                try:
-                    self._send_line(conn, make_protocol_mismatch(PROTOCOL_VERSION, client_ver))
-                except OSError:
-                    pass
-                self._drop_client(conn)
+                self._reject(st, encode_line(make_protocol_mismatch(PROTOCOL_VERSION, client_ver)))
                 self._emit_log(
-                    f"[!] Protocol mismatch from {addr} (client={client_ver}, server={PROTOCOL_VERSION})",
+                    f"[!] Protocol mismatch from {st.addr} (client={client_ver}, server={PROTOCOL_VERSION})",
                     "warn",
                 )
                 return
 
-            try:
-                self._send_line(conn, make_protocol_ok(PROTOCOL_VERSION))
-            except OSError:
-                pass
+            self._write(st, PROTOCOL_OK_RESPONSE)
+            st.stage = "username"
+            return
 
-            username_line, buffer = self._recv_line_handshake(conn, buffer=buffer)
-            username = (username_line or "").strip()
+        username = decode_line(raw_line).strip()
 
-            if not username:
-                try:
-                    self._send_line(conn, "@ERR username_empty")
-                except OSError:
-                    pass
-                self._drop_client(conn)
-                return
+        if not username:
+            self._reject(st, ERR_USERNAME_EMPTY)
+            return
 
-            if username.casefold() == "server":
-                try:
-                    self._send_line(conn, "@ERR username_reserved")
-                except OSError:
-                    pass
-                self._drop_client(conn)
-                return
+        if len(username) > MAX_USERNAME:
+            self._reject(st, ERR_USERNAME_TOO_LONG)
+            return
 
-            if self._username_taken(username):
-                try:
-                    self._send_line(conn, "@ERR username_taken")
-                except OSError:
-                    pass
-                self._drop_client(conn)
-                return
+        name_key = username.casefold()
+        if name_key == "server":
+            self._reject(st, ERR_USERNAME_RESERVED)
+            return
 
-            with self._lock:
-                self.clients[conn] = (username, addr)
+        if self._username_taken(username):
+            self._reject(st, ERR_USERNAME_TAKEN)
+            return
 
-            self._send_line(conn, "@OK")
-            self._emit_log(f"[+] {username} connected from {addr}", "connect")
-            self._emit_clients()
-            self._broadcast(f"* {username} joined", exclude=None)
+        st.username = username
+        st.name_key = name_key
+        st.prefix = f"{username}: ".encode("utf-8")
+        st.stage = "chat"
+        self.clients[st.sock] = st
+        self._by_name[name_key] = st.sock
+        self._clients_gen += 1
 
-            while self._running:
-                lines, buffer = split_lines(buffer)
-                for raw_line in lines:
-                    text = raw_line.strip()
-                    if not text:
-                        continue
-                    self._emit_log(f"{username}: {text}", "chat")
-                    self._broadcast(f"{username}: {text}")
+        self._write(st, OK_RESPONSE)
+        self._emit_log(f"[+] {username} connected from {st.addr}", "connect")
+        self._queue_broadcast(f"* {username} joined")
+        # после строки о входе: список уйдёт тем же send'ом
+        self._schedule_clients()
 
-                chunk = conn.recv(1024)
-                if not chunk:
-                    break
-                buffer += chunk.decode("utf-8", errors="replace")
+    def stop(self):
+        # если сервер не запущен — не пишем "stopped" как будто он реально работал
+        if not self._running:
+            self._emit_log("Server is not running", "info")
+            return
 
-        except Exception as e:
-            self._emit_log(f"[!] client error {addr}: {e}", "error")
-        finally:
-            with self._lock:
-                self.clients.pop(conn, None)
+        # остальное доделает цикл в finally
+        self._running = False
+        self._started_at = None
+        self._wakeup()
 
-            try:
-                conn.close()
-            except OSError:
-                pass
+    def kick(self, username: str) -> bool:
+        name_key = username.casefold()
+        if name_key not in self._by_name:
+            return False
+        self._call_soon(lambda: self._kick(name_key))
+        return True
 
-            self._emit_clients()
-            if username:
-                self._emit_log(f"[-] {username} disconnected", "disconnect")
\ No newline at end of file
+    def _kick(self, name_key: str):
+        conn = self._by_name.get(name_key)
+        target = self.clients.get(conn) if conn is not None else None
+        if target is None:
+            return
+
+        self._send_control(target, KICK_BYTES)
+
+        # убрать из списка и закрыть сразу — чтобы не было “мнимых” клиентов
+        self._drop_client(target.sock)
+        self._emit_log(f"[!] {target.username} kicked", "warn")
+        self._emit_clients()